@@ -71,40 +71,58 @@
 #  Date        SE   Change Description
 #  ----------  ---  -------------------------------------------------------
 #
+#  10/15/2026  agt  Parse the arguments with argparse and exit with the
+#                   status returned by clusterlib.bucketize().
+#
 #  09/27/2002  DBM  Initial development
 #
 ###########################################################################
 
 import sys
 import os
+import argparse
 import clusterlib
 import db
 
 #
 #  Global Variables
 #
-usage = "USAGE: " + sys.argv[0] + \
-        " Cluster-File1 Cluster-File2 Bucket-Prefix"
-
 clusterfile1 = ""   # The first cluster set input file.
 clusterfile2 = ""   # The second cluster set input file.
 bucketprefix = ""   # The file prefix for the bucketizer output files.
 
 
 #
-#  MAIN
+#  Argument type for the cluster files, so a missing file is reported
+#  before the database connection is opened.
 #
+def existingFile(file):
+    if (not os.path.exists(file)):
+        raise argparse.ArgumentTypeError("Input file does not exist: %s" % file)
+    return file
+
 
 #
-#  Make sure all the arguments to the script have been supplied.
+#  MAIN
+#
+
 #
-if (len(sys.argv) == 4):
-    clusterfile1 = sys.argv[1]
-    clusterfile2 = sys.argv[2]
-    bucketprefix = sys.argv[3]
-else:
-    print (usage)
-    sys.exit(1);
+#  Make sure all the arguments to the script have been supplied.  The
+#  parser prints the usage if they have not; exit with status 1 rather
+#  than the parser's own status.
+#
+parser = argparse.ArgumentParser()
+parser.add_argument('clusterfile1', metavar='Cluster-File1', type=existingFile)
+parser.add_argument('clusterfile2', metavar='Cluster-File2', type=existingFile)
+parser.add_argument('bucketprefix', metavar='Bucket-Prefix')
+try:
+    args = parser.parse_args()
+except SystemExit as e:
+    sys.exit(1 if e.code else 0)
+
+clusterfile1 = args.clusterfile1
+clusterfile2 = args.clusterfile2
+bucketprefix = args.bucketprefix
 
 #
 #  Use one continuous connection to the database so temporary tables that
@@ -115,15 +133,15 @@ db.useOneConnection(1)
 #
 #  Call the bucketizer to create the output files.
 #
-clusterlib.bucketize(file1=clusterfile1, file2=clusterfile2,
-                     prefix=bucketprefix)
+rc = clusterlib.bucketize(file1=clusterfile1, file2=clusterfile2,
+                          prefix=bucketprefix)
 
 #
 #  Close the connection to the database.
 #
 db.useOneConnection(0)
 
-sys.exit(0)
+sys.exit(rc)
 
 ###########################################################################
 #
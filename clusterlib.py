@@ -46,17 +46,23 @@
 #      <prefix>.Nto1:  The bucket file containing N:1 relationships.
 #      <prefix>.NtoN:  The bucket file containing N:N relationships.
 #
-#  Env Vars:  None
+#  Env Vars:
+#
+#      CLUSTERLIB_TRACE:  Set to "1" to turn on tracing of the SQL
+#                         statements issued by this module.
 #
 #  Exit Codes:  See individual functions within this module.
 #
-#  Assumes:  If one or both of the cluster sets for the bucketizer are
-#            coming from the database, the calling script should have
-#            already established a connection to the database.  In addition,
-#            the function "db.useOneConnection(1)" should have been used
-#            to ensure that the connection is not automatically closed
-#            after each call to "db.sql()".  Otherwise, temporary tables
-#            will be lost between processing steps.
+#  Assumes:  The calling script should have already established a
+#            connection to the database, whether the cluster sets come from
+#            files or tables.  In addition, the function
+#            "db.useOneConnection(1)" should have been used to ensure that
+#            the connection is not automatically closed after each call to
+#            "db.sql()".  The bucketizer always creates temporary tables and
+#            uses COPY on this shared connection, so it will not run
+#            without it.  The connection is read from the
+#            "sharedDbConnection" global of the module that defines
+#            "db.sql()" (pg_db).
 #
 #            It is also assumed that any cluster sets that come from input
 #            files will not contain any duplicates.
@@ -70,6 +76,14 @@
 #  Date        SE   Change Description
 #  ----------  ---  -------------------------------------------------------
 #
+#  10/15/2026  agt  bucketize() raises ValueError for invalid arguments
+#                   instead of printing a message and returning 1.
+#                   "db.useOneConnection(1)" is now required for table
+#                   inputs as well as files; without a shared connection
+#                   RuntimeError is raised.  Files are loaded and buckets
+#                   are written with COPY, the buckets are built in SQL,
+#                   and CLUSTERLIB_TRACE=1 turns on SQL tracing.
+#
 # 11/21/2016   sc   remove setAutoTranslate*
 #
 #  07/19/2016  sc   Convert to postgres
@@ -82,7 +96,10 @@ import sys
 import os
 import db
 
-db.setTrace(True)
+#
+#  SQL tracing is off unless CLUSTERLIB_TRACE=1 is set in the environment.
+#
+db.setTrace(os.environ.get('CLUSTERLIB_TRACE') == '1')
 
 #
 #  Global Variables
@@ -94,8 +111,7 @@ set2_table = None    #  Table that contains the 2nd cluster set.
 set2_cid = None      #  Cluster ID column in the 2nd cluster set.
 set2_cmid = None     #  Cluster member ID column in the 2nd cluster set.
 
-clist1 = []          #  List of set 1 clusters that map to set 2 clusters.
-clist2 = []          #  List of set 2 clusters that map to set 1 clusters.
+bufsize = 1 << 20    #  Buffer size used for the input and bucket files.
 
 
 #
@@ -110,11 +126,40 @@ def printSourceCounts():
     print ("Source 2 records: %d" % counts[1][0][''])
     sys.stdout.flush()
 
-def printLists():
-    print (clist1)
-    print (clist2)
-    print ()
-    sys.stdout.flush()
+
+###########################################################################
+#  Function:  getCursor
+#
+#  Purpose:  Get a cursor on the shared database connection, which owns
+#            the temporary tables created by this module.
+#
+#  Arguments:  None
+#
+#  Returns:  A cursor on the shared database connection
+#
+#  Assumes:  The module that defines "db.sql()" keeps the shared
+#            connection in its "sharedDbConnection" global (pg_db does).
+#
+#  Effects:  Nothing
+#
+#  Throws:  RuntimeError if there is no shared database connection.
+#
+#  Notes:  The shared connection only exists after "db.useOneConnection(1)"
+#          has been called and "db.sql()" has been run at least once.
+#          It is looked up in the module that defines "db.sql()", rather
+#          than in "db" itself, because a "db" module that re-exports
+#          pg_db with "from pg_db import *" only has a copy of the value
+#          from when it was imported.
+###########################################################################
+def getCursor():
+
+    owner = sys.modules.get(db.sql.__module__, db)
+    conn = getattr(owner, 'sharedDbConnection', None)
+    if (conn == None):
+        raise RuntimeError("No shared database connection; " + \
+                           "call db.useOneConnection(1) before bucketize()")
+
+    return conn.cursor()
 
 
 ###########################################################################
@@ -131,23 +176,28 @@ def printLists():
 #  Returns:  0 - Successful completion
 #            1 - An error occurred
 #
-#  Assumes:  Nothing
+#  Assumes:  The calling script has called "db.useOneConnection(1)", so
+#            the COPY is issued on the same connection that owns the
+#            temporary table.
 #
 #  Effects:  Nothing
 #
-#  Throws:  Nothing
+#  Throws:  RuntimeError if there is no shared database connection.
 #
-#  Notes:  None
+#  Notes:  The input file is loaded using the COPY csv format with a
+#          control character (\x01) as the quote character, so backslashes
+#          are not treated as escapes, empty IDs are loaded as empty
+#          strings rather than NULL and the IDs are stored literally.  Each
+#          record must be "Cluster-ID<TAB>Cluster-Member-ID".
 ###########################################################################
 def loadFileSource(file, tempno):
 
     #
-    #  Make sure the input file exists and open it.
+    #  Make sure the input file exists.
     #
     if (not os.path.exists(file)):
         print ("Input file does not exist: %s" % file)
         return 1
-    inFile = open(file, 'r')
 
     #
     #  Create a temp table to load the cluster set into.
@@ -157,30 +207,41 @@ def loadFileSource(file, tempno):
     db.sql(create_stmt,None)
 
     #
-    #  Build the SQL statement that will be used to insert the clusters
-    #  into the temp table.
+    #  Stream the input file into the temp table with a single COPY rather
+    #  than issuing an insert for each record.  The csv format is used with
+    #  a quote character that cannot occur in the data, so the IDs are
+    #  loaded literally (the text format would interpret backslashes).
+    #  The file is read and sent to the server in large blocks.
     #
-    insert_stmt = "insert into cluster_set%d " % tempno + \
-                  "values ('%s', '%s')"
+    copy_stmt = "copy cluster_set%d (cid, cmid) from stdin " % tempno + \
+                "with (format csv, delimiter E'\\t', quote E'\\x01', " + \
+                "force_not_null (cid, cmid))"
+    inFile = open(file, 'r', bufsize)
+    cursor = getCursor()
+    cursor.copy_expert(copy_stmt, inFile, bufsize)
+    cursor.close()
+    inFile.close()
 
     #
-    #  Loop through each record in the input file and load the clusters.
+    #  Index the cluster members (used to join the cluster sets) and the
+    #  cluster IDs (used by the 0:1 and 1:0 bucket queries), then gather
+    #  statistics on the new table so the planner can choose a sensible
+    #  join strategy.
     #
-    for line in inFile.readlines():
-        [cid, cmid] = line[:-1].split('\t')
-        db.sql(insert_stmt % (cid, cmid), None)
+    db.sql("create index on cluster_set%d (cmid)" % tempno, None)
+    db.sql("create index on cluster_set%d (cid)" % tempno, None)
+    db.sql("analyze cluster_set%d" % tempno, None)
 
-    inFile.close()
     return 0
 
 
 ###########################################################################
-#  Function:  getLists
+#  Function:  loadPairs
 #
-#  Purpose:  Join two cluster sets that reside in tables using the cluster
-#            members for the join condition.  The cluster ID from each set
-#            are saved in lists and will eventually be saved in the
-#            different bucket files.
+#  Purpose:  Join the two cluster sets using the cluster members for the
+#            join condition and save each distinct pair of associated
+#            cluster IDs in a temporary table.  All of the bucket queries
+#            use this table, so the cluster sets are only joined once.
 #
 #  Arguments:  None
 #
@@ -188,78 +249,62 @@ def loadFileSource(file, tempno):
 #
 #  Assumes:  Nothing
 #
-#  Effects:  Adds the cluster IDs to the cluster list variables.
+#  Effects:  Creates the "cluster_pairs" temporary table, which is
+#            dropped by bucketize() when the buckets have been written.
 #
 #  Throws:  Nothing
 #
 #  Notes:  None
 ###########################################################################
-def getLists():
-    global clist1, clist2
+def loadPairs():
 
-    #
-    #  Find all the clusters from each table that map to each other via
-    #  their cluster members.
-    #
-    map = db.sql("select distinct s1.%s as cid1, s2.%s as cid2 " % (set1_cid, set2_cid) + \
-                 "from %s s1, %s s2 " % (set1_table, set2_table) + \
-                 "where s1.%s = s2.%s " % (set1_cmid, set2_cmid) + \
-                 "order by s2.%s, s1.%s" % (set2_cid, set1_cid),'auto')
+    db.sql("create temporary table cluster_pairs as " + \
+           "select distinct s1.%s as cid1, s2.%s as cid2 " % (set1_cid, set2_cid) + \
+           "from %s s1, %s s2 " % (set1_table, set2_table) + \
+           "where s1.%s = s2.%s" % (set1_cmid, set2_cmid), None)
 
-    #
-    #  Save the cluster IDs in the cluster lists.
-    #
-    for m in map:
-        clist1.append(m['cid1'])
-        clist2.append(m['cid2'])
+    db.sql("create index on cluster_pairs (cid1)", None)
+    db.sql("create index on cluster_pairs (cid2)", None)
+    db.sql("analyze cluster_pairs", None)
 
     return 0
 
 
 ###########################################################################
-#  Function:  sortLists
+#  Function:  writeBucket
 #
-#  Purpose:  Sort the cluster lists based on the IDs in the first or
-#            second list.
+#  Purpose:  Write the results of a query to a bucket file.  The server
+#            formats the results with a COPY, so the rows are written to
+#            the file without being processed by Python.
 #
-#  Arguments:  sortby - 1 means to sort by the first list
-#                       2 means to sort by the second list
+#  Arguments:  query - The query that selects the bucket records.
+#              file - The full path name of the bucket file.
 #
 #  Returns:  0 - Successful completion
 #
-#  Assumes:  Nothing
+#  Assumes:  The query selects 2 columns, which are written to the file
+#            separated by a tab.
 #
-#  Effects:  Sorts the cluster IDs in the cluster list variables.
+#  Effects:  Nothing
 #
-#  Throws:  Nothing
+#  Throws:  RuntimeError if there is no shared database connection.
 #
-#  Notes:  None
+#  Notes:  The results are written using the COPY csv format with the same
+#          tab delimiter and control character (\x01) quote character that
+#          loadFileSource() uses, so backslashes are not escaped and the
+#          IDs are written literally.  A NULL value is written as an empty
+#          field.  A value that is an empty string or contains a tab,
+#          newline or \x01 is enclosed in \x01 characters.
 ###########################################################################
-def sortLists(sortby):
-
-    #
-    #  Determine which cluster list to base the sorting on.
-    #
-    if (sortby == 1):
-        set1 = clist1
-        set2 = clist2
-    else:
-        set1 = clist2
-        set2 = clist1
-
-    #
-    #  Perform the standard bubble sort on each list, making sure that the
-    #  clusters from each list remain paired (same index).
-    #
-    for i in range(0,len(set1)):
-        for j in range(i,len(set1)):
-            if (set1[j]+set2[j] < set1[i]+set2[i]):
-                temp1 = set1[i]
-                temp2 = set2[i]
-                set1[i] = set1[j]
-                set2[i] = set2[j]
-                set1[j] = temp1
-                set2[j] = temp2
+def writeBucket(query, file):
+
+    outFile = open(file, 'w', bufsize)
+    cursor = getCursor()
+    cursor.copy_expert("copy (%s) to stdout " % query + \
+                       "with (format csv, delimiter E'\\t', quote E'\\x01')",
+                       outFile)
+    cursor.close()
+    outFile.close()
 
     return 0
 
@@ -275,7 +320,7 @@ def sortLists(sortby):
 #
 #  Returns:  0 - Successful completion
 #
-#  Assumes:  Nothing
+#  Assumes:  The "cluster_pairs" table has been created by loadPairs().
 #
 #  Effects:  Nothing
 #
@@ -286,23 +331,16 @@ def sortLists(sortby):
 def get0to1(prefix):
 
     #
-    #  Build the query to find the 0:1 relationships.
+    #  Build the query to find the 0:1 relationships and write the results
+    #  to the bucket file.
     #
-    res = db.sql("select s2.%s, s2.%s " % (set2_cid, set2_cmid) + \
-                 "from %s s2 " % set2_table + \
-                 "where s2.%s not in " % (set2_cid) + \
-                     "(select s2.%s " % set2_cid + \
-                     "from %s s1, %s s2 " % (set1_table, set2_table) + \
-                     "where s1.%s = s2.%s) " % (set1_cmid, set2_cmid) + \
-                 "order by s2.%s, s2.%s" % (set2_cid, set2_cmid),'auto')
-
-    #
-    #  Create the bucket file write all the results to it.
-    #
-    outFile = open("%s.0to1" % prefix, 'w')
-    for r in res:
-        outFile.write("%s\t%s\n" % (r[set2_cid],r[set2_cmid]))
-    outFile.close()
+    writeBucket("select s2.%s, s2.%s " % (set2_cid, set2_cmid) + \
+                "from %s s2 " % set2_table + \
+                "where not exists " + \
+                    "(select 1 from cluster_pairs p " + \
+                    "where p.cid2 = s2.%s) " % set2_cid + \
+                "order by s2.%s, s2.%s" % (set2_cid, set2_cmid),
+                "%s.0to1" % prefix)
 
     return 0
 
@@ -318,7 +356,7 @@ def get0to1(prefix):
 #
 #  Returns:  0 - Successful completion
 #
-#  Assumes:  Nothing
+#  Assumes:  The "cluster_pairs" table has been created by loadPairs().
 #
 #  Effects:  Nothing
 #
@@ -329,294 +367,81 @@ def get0to1(prefix):
 def get1to0(prefix):
 
     #
-    #  Build the query to find the 1:0 relationships.
+    #  Build the query to find the 1:0 relationships and write the results
+    #  to the bucket file.
     #
-    res = db.sql("select s1.%s, s1.%s " % (set1_cid, set1_cmid) + \
-                 "from %s s1 " % set1_table + \
-                 "where s1.%s not in " % (set1_cid) + \
-                     "(select s1.%s " % set1_cid + \
-                     "from %s s1, %s s2 " % (set1_table, set2_table) + \
-                     "where s1.%s = s2.%s) " % (set1_cmid, set2_cmid) + \
-                 "order by s1.%s, s1.%s" % (set1_cid, set1_cmid),'auto')
-
-    #
-    #  Create the bucket file write all the results to it.
-    #
-    outFile = open("%s.1to0" % prefix, 'w')
-    for r in res:
-        outFile.write("%s\t%s\n" % (r[set1_cid],r[set1_cmid]))
-    outFile.close()
+    writeBucket("select s1.%s, s1.%s " % (set1_cid, set1_cmid) + \
+                "from %s s1 " % set1_table + \
+                "where not exists " + \
+                    "(select 1 from cluster_pairs p " + \
+                    "where p.cid1 = s1.%s) " % set1_cid + \
+                "order by s1.%s, s1.%s" % (set1_cid, set1_cmid),
+                "%s.1to0" % prefix)
 
     return 0
 
 
 ###########################################################################
-#  Function:  get1to1
+#  Function:  getBuckets
 #
-#  Purpose:  Find clusters from each set that are only associated with each
-#            other.  These clusters are written to the "1:1" bucket.
+#  Purpose:  Classify each pair of associated clusters by the number of
+#            clusters each one maps to.  The pairs are written to the
+#            "1:1", "1:N", "N:1" and "N:N" buckets.
 #
-#  Arguments:  prefix - The prefix for the bucket file.
+#  Arguments:  prefix - The prefix for the bucket files.
 #
 #  Returns:  0 - Successful completion
 #
-#  Assumes:  Nothing
+#  Assumes:  The "cluster_pairs" table has been created by loadPairs().
 #
-#  Effects:  The clusters are deleted from the cluster lists when they are
-#            written to the bucket.
+#  Effects:  Creates the "cluster_buckets" temporary table, which is
+#            dropped by bucketize() when the buckets have been written.
 #
 #  Throws:  Nothing
 #
-#  Notes:  None
+#  Notes:  A pair belongs to the "1:N" bucket when the cluster from the
+#          first set maps to multiple clusters in the second set and none
+#          of those clusters map to any other cluster in the first set
+#          ("N:1" is the reverse).  Pairs that are not 1:1, 1:N or N:1 go
+#          in the "N:N" bucket.
 ###########################################################################
-def get1to1(prefix):
-    global clist1, clist2
-
-    #
-    #  Create the bucket file for the 1:1 relationships.
-    #
-    outFile = open("%s.1to1" % prefix, 'w')
-
-    i = 0
-    while (i < len(clist1)):
-
-        #
-        #  Find associated clusters that only occur once in their
-        #  respective cluster sets.
-        #
-        if (clist1.count(clist1[i]) == 1 and clist2.count(clist2[i]) == 1):
-            outFile.write("%s\t%s\n" % (clist1[i],clist2[i]))
-            del clist1[i]
-            del clist2[i]
-        else:
-            i = i + 1
-
-    outFile.close()
-    return 0
-
-
-###########################################################################
-#  Function:  get1toN
-#
-#  Purpose:  Find all the clusters in the first cluster set that are
-#            associated with multiple clusters in the second cluster set.
-#            These clusters are written to the "1:N" bucket.
-#
-#  Arguments:  prefix - The prefix for the bucket file.
-#
-#  Returns:  0 - Successful completion
-#
-#  Assumes:  Nothing
-#
-#  Effects:  The clusters are deleted from the cluster lists when they are
-#            written to the bucket.
-#
-#  Throws:  Nothing
-#
-#  Notes:  None
-###########################################################################
-def get1toN(prefix):
-    global clist1, clist2
-
-    #
-    #  Create the bucket file for the 1:N relationships.
-    #
-    outFile = open("%s.1toN" % prefix, 'w')
-
-    #
-    #  Loop through the first cluster ID list to find all cluster IDs that
-    #  have 1:N relationships with cluster IDs in the second list.
-    #
-    i = 0
-    while (i < len(clist1)):
-
-        #
-        #  Save the current cluster ID from the first list and then make a
-        #  temporary mapping list of all the cluster IDs in the second list
-        #  that map to it.
-        #
-        c1 = clist1[i]
-        nlist = []
-        for j in range(i,len(clist1)):
-            if (clist1[j] == c1):
-                nlist.append(clist2[j])
-
-        #
-        #  For each cluster ID in the temporary mapping list, make sure it
-        #  maps exclusively to the current cluster ID in the first list.
-        #  Otherwise, it would be a N:N relationship, not 1:N.
-        #
-        match = 1
-        if (len(nlist) > 1):
-            for j in range(0,len(nlist)):
-                if (clist2.count(nlist[j]) > 1):
-                    match = 0
-                    break
-        else:
-            match = 0
-
-        #
-        #  If a 1:N relationship has been found, go through the first list
-        #  starting at the current position and write all the mappings to
-        #  the bucket.
-        #
-        if (match):
-            j = i
-            while (j < len(clist1)):
-                if (clist1[j] == c1):
-                    outFile.write("%s\t%s\n" % (clist1[j],clist2[j]))
-                    del clist1[j]
-                    del clist2[j]
-                else:
-                    j = j + 1
-
-        #
-        #  If the current cluster ID in the first list does not have a 1:N
-        #  relationship with the second list, advance the counter to point
-        #  to the next cluster ID in the list that is different.
-        #
-        else:
-            i = i + 1
-            while (i < len(clist1)):
-                if (clist1[i] == c1):
-                    i = i + 1
-                else:
-                    break
-
-    outFile.close()
-    return 0
-
-
-###########################################################################
-#  Function:  getNto1
-#
-#  Purpose:  Find all the clusters in the second cluster set that are
-#            associated with multiple clusters in the first cluster set.
-#            These clusters are written to the "N:1" bucket.
-#
-#  Arguments:  prefix - The prefix for the bucket file.
-#
-#  Returns:  0 - Successful completion
-#
-#  Assumes:  Nothing
-#
-#  Effects:  The clusters are deleted from the cluster lists when they are
-#            written to the bucket.
-#
-#  Throws:  Nothing
-#
-#  Notes:  None
-###########################################################################
-def getNto1(prefix):
-    global clist1, clist2
-
-    #
-    #  Create the bucket file for the N:1 relationships.
-    #
-    outFile = open("%s.Nto1" % prefix, 'w')
-
-    #
-    #  Loop through the second cluster ID list to find all cluster IDs that
-    #  have N:1 relationships with cluster IDs in the first list.
-    #
-    i = 0
-    while (i < len(clist2)):
-
-        #
-        #  Save the current cluster ID from the second list and then make a
-        #  temporary mapping list of all the cluster IDs in the first list
-        #  that map to it.
-        #
-        c2 = clist2[i]
-        nlist = []
-        for j in range(i,len(clist2)):
-            if (clist2[j] == c2):
-                nlist.append(clist1[j])
-
-        #
-        #  For each cluster ID in the temporary mapping list, make sure it
-        #  maps exclusively to the current cluster ID in the second list.
-        #  Otherwise, it would be a N:N relationship, not N:1.
-        #
-        match = 1
-        if (len(nlist) > 1):
-            for j in range(0,len(nlist)):
-                if (clist1.count(nlist[j]) > 1):
-                    match = 0
-                    break
-        else:
-            match = 0
-
-        #
-        #  If a 1:N relationship has been found, go through the second list
-        #  starting at the current position and write all the mappings to
-        #  the bucket.
-        #
-        if (match):
-            j = i
-            while (j < len(clist2)):
-                if (clist2[j] == c2):
-                    outFile.write("%s\t%s\n" % (clist1[j],clist2[j]))
-                    del clist1[j]
-                    del clist2[j]
-                else:
-                    j = j + 1
-
-        #
-        #  If the current cluster ID in the second list does not have a 1:N
-        #  relationship with the first list, advance the counter to point
-        #  to the next cluster ID in the list that is different.
-        #
-        else:
-            i = i + 1
-            while (i < len(clist2)):
-                if (clist2[i] == c2):
-                    i = i + 1
-                else:
-                    break
-
-    outFile.close()
-    return 0
-
-
-###########################################################################
-#  Function:  getNtoN
-#
-#  Purpose:  Find multiple clusters in the first cluster set that are
-#            associated with multiple clusters in the second cluster set.
-#            These clusters are written to the "N:N" bucket.
-#
-#  Arguments:  prefix - The prefix for the bucket file.
-#
-#  Returns:  0 - Successful completion
-#
-#  Assumes:  Nothing
-#
-#  Effects:  The clusters are deleted from the cluster lists when they are
-#            written to the bucket.
-#
-#  Throws:  Nothing
-#
-#  Notes:  None
-###########################################################################
-def getNtoN(prefix):
-    global clist1, clist2
-
-    #
-    #  Create the bucket file for the N:N relationships.
-    #
-    outFile = open("%s.NtoN" % prefix, 'w')
-
-    #
-    #  By process of elimination, any cluster IDs left in the two lists
-    #  must be part of N:N relationships because all the 1:1, 1:N and N:1
-    #  relationship have already been removed.
-    #
-    for i in range(0,len(clist1)):
-        outFile.write("%s\t%s\n" % (clist1[0],clist2[0]))
-        del clist1[0]
-        del clist2[0]
-    outFile.close()
+def getBuckets(prefix):
+
+    #
+    #  For each distinct pair of associated clusters, count the number of
+    #  clusters that each one maps to (d1, d2), then find the largest
+    #  count among the clusters that share each side of the pair (maxd1,
+    #  maxd2).  Save each pair with its bucket in a temporary table.
+    #
+    db.sql("create temporary table cluster_buckets as " + \
+           "with degrees as " + \
+               "(select cid1, cid2, " + \
+               "count(*) over (partition by cid1) as d1, " + \
+               "count(*) over (partition by cid2) as d2 " + \
+               "from cluster_pairs), " + \
+           "groups as " + \
+               "(select cid1, cid2, d1, d2, " + \
+               "max(d1) over (partition by cid2) as maxd1, " + \
+               "max(d2) over (partition by cid1) as maxd2 " + \
+               "from degrees) " + \
+           "select cid1, cid2, " + \
+               "case when d1 = 1 and d2 = 1 then '1to1' " + \
+               "when d2 > 1 and maxd1 = 1 then 'Nto1' " + \
+               "when d1 > 1 and maxd2 = 1 then '1toN' " + \
+               "else 'NtoN' end as bucket " + \
+           "from groups", None)
+
+    #
+    #  Write the pairs for each bucket to its bucket file.  The N:1 pairs
+    #  are ordered by the second cluster ID and all other pairs are ordered
+    #  by the first cluster ID.
+    #
+    for (bucket, order) in (('1to1', 'cid1, cid2'), ('1toN', 'cid1, cid2'),
+                            ('Nto1', 'cid2, cid1'), ('NtoN', 'cid1, cid2')):
+        writeBucket("select cid1, cid2 from cluster_buckets " + \
+                    "where bucket = '%s' " % bucket + \
+                    "order by %s" % order,
+                    "%s.%s" % (prefix, bucket))
 
     return 0
 
@@ -638,7 +463,7 @@ def getNtoN(prefix):
 #              prefix - The prefix (including the path) for the bucket files.
 #
 #  Returns:  0 - Successful completion
-#            1 - An error occurred
+#            1 - An input file could not be loaded
 #
 #  Assumes:  Nothing
 #
@@ -647,7 +472,9 @@ def getNtoN(prefix):
 #            The set2_table, set2_cid and set2_cmid variables are set to the
 #            table and column names for the second cluster set.
 #
-#  Throws:  Nothing
+#  Throws:  ValueError if the arguments do not describe exactly one file
+#           or table for each cluster set and a bucket file prefix.
+#           RuntimeError if there is no shared database connection.
 #
 #  Notes:  None
 ###########################################################################
@@ -661,37 +488,30 @@ def bucketize(file1=None, table1=None, cid1=None, cmid1=None,
     tempno = 0  #  Counter used to create temporary table names.
 
     #
-    #  Validate the arguments to the function.  There should be a file OR
-    #  a table supplied for the first cluster set and a file OR a table
-    #  supplied for the second cluster set.
+    #  Validate the arguments to the function before doing any work.  There
+    #  should be a file OR a table supplied for the first cluster set and a
+    #  file OR a table supplied for the second cluster set.
     #
     if (file1 == None) and (table1 == None):
-        print ("No file or table was given for source 1")
-        return 1
+        raise ValueError("No file or table was given for source 1")
 
     if (file1 != None) and (table1 != None):
-        print ("A file and table were both given for source 1")
-        return 1
+        raise ValueError("A file and table were both given for source 1")
 
     if (table1 != None) and (cid1 == None or cmid1 == None):
-        print ("Cluster or cluster member column not specified for source 1")
-        return 1
+        raise ValueError("Cluster or cluster member column not specified for source 1")
 
     if (file2 == None) and (table2 == None):
-        print ("No file or table was given for source 2")
-        return 1
+        raise ValueError("No file or table was given for source 2")
 
     if (file2 != None) and (table2 != None):
-        print ("A file and table were both given for source 2")
-        return 1
+        raise ValueError("A file and table were both given for source 2")
 
     if (table2 != None) and (cid2 == None or cmid2 == None):
-        print ("Cluster or cluster member column not specified for source 2")
-        return 1
+        raise ValueError("Cluster or cluster member column not specified for source 2")
 
     if (prefix == None):
-        print ("Prefix for bucket files not specified")
-        return 1
+        raise ValueError("Prefix for bucket files not specified")
 
     #
     #  If a file was provided for the first cluster set, load the clusters
@@ -726,6 +546,8 @@ def bucketize(file1=None, table1=None, cid1=None, cmid1=None,
             set2_cid = "cid"
             set2_cmid = "cmid"
         else:
+            if (file1 != None):
+                db.sql("drop table %s" % set1_table, None)
             return 1
 
     #
@@ -737,6 +559,12 @@ def bucketize(file1=None, table1=None, cid1=None, cmid1=None,
         set2_cid = cid2
         set2_cmid = cmid2
 
+    #
+    #  Join the two cluster sets together by mapping the cluster member IDs
+    #  and save the pairs of associated cluster IDs.
+    #
+    loadPairs()
+
     #
     #  Create the 0:1 and 1:0 buckets by getting the cluster IDs in each
     #  set that are not in the other set.
@@ -745,30 +573,19 @@ def bucketize(file1=None, table1=None, cid1=None, cmid1=None,
     get1to0(prefix)
 
     #
-    #  Join the two cluster sets together by mapping the cluster member IDs.
-    #  Create lists of the clusters IDs from each set that map to each other.
-    #  The lists are initially sorted based on the cluster IDs in the second
-    #  list, so that the N:1 relationship can be found.
-    #
-    getLists()
-
-    #
-    #  Create the N:1 bucket.
-    #
-    getNto1(prefix)
-
-    #
-    #  Re-sort the cluster lists based on the cluster IDs in the first list,
-    #  so that the 1:1, 1:N and N:N relationships can be found.
+    #  Create the 1:1, 1:N, N:1 and N:N buckets.
     #
-    sortLists(1)
+    getBuckets(prefix)
 
     #
-    #  Create the 1:1, 1:N and N:N buckets.
+    #  Drop the pairs and buckets tables and any cluster set tables loaded
+    #  from files, so they do not use temporary space for the rest of the
+    #  session and bucketize() can be called again on the same connection.
     #
-    get1to1(prefix)
-    get1toN(prefix)
-    getNtoN(prefix)
+    db.sql("drop table cluster_pairs", None)
+    db.sql("drop table cluster_buckets", None)
+    for i in range(1, tempno + 1):
+        db.sql("drop table cluster_set%d" % i, None)
 
     return 0
 
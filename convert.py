@@ -63,6 +63,12 @@
 #  Notes:  Each line of the input file must have a cluster ID and at least
 #          1 cluster member ID.  If not, the input line will be ignored
 #          and nothing will be included in the output file for that line.
+#          Empty cluster member IDs (e.g. from consecutive delimiters) are
+#          not written to the output file.
+#
+#          A line that starts with whitespace is treated as having no
+#          cluster ID and is ignored.  Trailing spaces are removed from the
+#          cluster ID.
 #
 ###########################################################################
 #
@@ -76,9 +82,6 @@
 ###########################################################################
 
 import sys
-import os
-import regex
-import regsub
 
 #
 #  Global Variables
@@ -89,6 +92,9 @@ usage = "USAGE: " + sys.argv[0] + \
 inputfile = ""   # The cluster set input file.
 outputfile = ""  # The cluster set output file.
 delimiter = ""   # The delimiter between cluster members of the input file.
+wsdelim = False  # True if the delimiter is a whitespace character.
+bufsize = 1 << 20  # Buffer size used for the input and output files.
+flushsize = 1 << 16  # Amount of output to collect before each write.
 
 
 #
@@ -98,79 +104,108 @@ delimiter = ""   # The delimiter between cluster members of the input file.
 #
 #  Make sure all the arguments to the script have been supplied.
 #
-if (len(sys.argv) == 4):
+if (len(sys.argv) == 4 and len(sys.argv[3]) > 0):
     inputfile = sys.argv[1]
     outputfile = sys.argv[2]
-    delimiter = sys.argv[3]
+    delimiter = sys.argv[3].encode()
+    wsdelim = delimiter.isspace()
 else:
     print(usage)
     sys.exit(1)
 
 #
-#  Make sure the input file exists.
+#  Open the input and output files.  The files are processed as bytes,
+#  so no time is spent decoding and encoding the cluster IDs.  The output
+#  file is opened in exclusive mode, so it is created only if it does not
+#  already exist.
 #
-if (not os.path.exists(inputfile)):
+try:
+    inFile = open(inputfile, 'rb', bufsize)
+except FileNotFoundError:
     print("Input file does not exist: %s" % inputfile)
     sys.exit(1)
 
-#
-#  Make sure the output file does not already exists.
-#
-if (os.path.exists(outputfile)):
+try:
+    outFile = open(outputfile, 'xb', bufsize)
+except FileExistsError:
     print("Output file already exists: %s" % outputfile)
     sys.exit(1)
 
-#
-#  Open the input and output files.
-#
-inFile = open(inputfile, 'r')
-outFile = open(outputfile, 'w')
-
 #
 #  Convert each line in the input file to 1 or more lines in the
-#  output file.
+#  output file.  The output lines are collected in a buffer that is
+#  written to the output file each time it reaches the flush size.
+#
+#  The functions used in the loop are bound to names once, so they are
+#  not looked up again for every line.
 #
-for line in inFile.readlines():
+outBuf = bytearray()
+write = outFile.write
+strip = bytes.strip
+for line in inFile:
     #
-    #  Replace the whitespace with a pipe character between the cluster ID
-    #  and the list of cluster member IDs.  Ignore any line that does not
-    #  contain the proper whitespace separating the fields.
+    #  Split the line at the tab between the cluster ID and the list of
+    #  cluster member IDs.  Ignore any line that does not contain a tab.
     #
-    line = regsub.sub('[ 	]+','|',line)
-    pipe = regex.search('|',line)
-    if (pipe < 0):
+    (cid, tab, list) = line.partition(b'\t')
+    if (not tab):
         continue
 
     #
-    #  Ignore any line that does not contain a cluster ID.
+    #  Ignore any line that does not contain a cluster ID, including a
+    #  line that starts with whitespace.  Remove any trailing spaces from
+    #  the cluster ID.
     #
-    if (line[0] == '|'):
+    if (line[:1] == b' '):
+        continue
+    cid = cid.rstrip(b' ')
+    if (len(cid) == 0):
         continue
 
     #
-    #  Locate and save the cluster ID.
-    #
-    cid = line[:pipe]
-
-    #
-    #  Get the list of cluster member IDs from the remainder of the line
-    #  and ignore the line if there is no list.
+    #  Remove the newline from the list of cluster member IDs and ignore
+    #  the line if there is no list.
     #
-    list = regsub.gsub('\n','',line[pipe+1:])
+    list = list.rstrip(b'\n')
     if (len(list) == 0):
         continue
 
     #
-    #  Extract the cluster member IDs from the list one at a time and write
-    #  them to the output file with the cluster ID.  The cluster member IDs
-    #  should be separated by the specified delimiter character.
+    #  Split the list on the specified delimiter character and add all of
+    #  the cluster member IDs to the output buffer with the cluster ID.
+    #  Empty cluster member IDs are skipped.  The cluster ID and tab that
+    #  start each output line are only built once per input line, and the
+    #  output lines are made with a single join of the cluster member IDs.
+    #
+    #  If the delimiter is whitespace, splitting on any run of whitespace
+    #  gives the cluster member IDs without surrounding whitespace or
+    #  empty IDs, so they do not need to be stripped or checked.
+    #
+    #  A list that does not contain a (non-whitespace) delimiter has a
+    #  single cluster member ID, so it is added to the output buffer
+    #  without building a list of members.
     #
-    pos = regex.search(delimiter,list)
-    while (pos >= 0):
-        outFile.write(cid + "	" + str.strip(list[:pos]) + "\n")
-        list = list[pos+1:]
-        pos = regex.search(delimiter,list)
-    outFile.write(cid + "	" + str.strip(list) + "\n")
+    if (not wsdelim and delimiter not in list):
+        member = strip(list)
+        if (member):
+            outBuf += cid + b"\t" + member + b"\n"
+    else:
+        prefix = cid + b"\t"
+        if (wsdelim):
+            members = list.split()
+        else:
+            members = [m for m in map(strip, list.split(delimiter)) if m]
+        if (members):
+            outBuf += prefix + (b"\n" + prefix).join(members) + b"\n"
+
+    if (len(outBuf) >= flushsize):
+        write(outBuf)
+        del outBuf[:]
+
+#
+#  Write whatever is left in the output buffer.
+#
+write(outBuf)
 
 #
 #  Close the input and output files.